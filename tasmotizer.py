@@ -1,18 +1,26 @@
 #!/usr/bin/env python
+import os
 import re
 import sys
-from time import sleep
+from operator import itemgetter
+from queue import Queue
+from time import monotonic
 
 import serial
 
 import tasmotizer_esptool as esptool
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from datetime import datetime
 
-from PyQt5.QtCore import QUrl, Qt, QThread, QObject, pyqtSignal, pyqtSlot, QSettings, QTimer, QSize, QIODevice
-from PyQt5.QtGui import QPixmap, QCloseEvent
-from PyQt5.QtNetwork import QNetworkRequest, QNetworkAccessManager, QNetworkReply
+from PyQt5.QtCore import QUrl, Qt, QThread, QObject, pyqtSignal, pyqtSlot, QSettings, QTimer, QSize, QIODevice, \
+    QMutex, QWaitCondition, QRunnable, QThreadPool, QStandardPaths
+from PyQt5.QtGui import QPixmap, QCloseEvent, QImage, QImageReader, QStandardItemModel, QStandardItem
 from PyQt5.QtSerialPort import QSerialPortInfo, QSerialPort
 from PyQt5.QtWidgets import QApplication, QDialog, QLineEdit, QPushButton, QComboBox, QWidget, QCheckBox, QRadioButton, \
     QButtonGroup, QFileDialog, QProgressBar, QLabel, QMessageBox, QPlainTextEdit, QTextEdit, QDialogButtonBox, QGroupBox, QFormLayout, QStatusBar
@@ -22,12 +30,73 @@ import banner
 from gui import HLayout, VLayout, GroupBoxH, GroupBoxV, SpinBox, dark_palette
 from utils import MODULES, NoBinFile, NetworkError
 
-from copy import deepcopy
-
 __version__ = '1.2.1'
 
 BINS_URL = 'http://ota.tasmota.com'
 
+_BACKUP_SIZES = tuple(f'{2 ** s}MB' for s in range(5))
+
+_BUTTONS_QSS = ' '.join([
+    'QPushButton#tasmotize { background-color: #223579; }',
+    'QPushButton#config { background-color: #571054; }',
+    'QPushButton#getip { background-color: #2a8a26; }',
+    'QPushButton#quit { background-color: #c91017; }',
+    'QPushButton#sendcmd { background-color: #aaaa00; }',
+    'QPushButton#pincfg { background-color: #2a8a26; }',
+])
+
+_JSON_DECODER = json.JSONDecoder()
+# a number or true/false/null cut off by the end of what has been read so far
+_JSON_TAIL = re.compile(r'[\w.+-]*\Z')
+_BIN_FIELDS = itemgetter('binary', 'filesize', 'otaurl')
+
+_SETTINGS = None
+_NAM = None
+_MODULES_MODEL = None
+# downloaded feeds by url, fetched on first use and kept for the whole session
+_FEEDS = {}
+
+
+def settings():
+    global _SETTINGS
+    if _SETTINGS is None:
+        _SETTINGS = QSettings('tasmotizer.cfg', QSettings.IniFormat)
+    return _SETTINGS
+
+
+def modules_model():
+    global _MODULES_MODEL
+    if _MODULES_MODEL is None:
+        _MODULES_MODEL = QStandardItemModel()
+        for mod_id, mod_name in MODULES.items():
+            item = QStandardItem(mod_name)
+            item.setData(mod_id, Qt.UserRole)
+            _MODULES_MODEL.appendRow(item)
+    return _MODULES_MODEL
+
+
+def network_manager():
+    global _NAM
+    if _NAM is None:
+        # QtNetwork is only loaded once something is actually downloaded
+        from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkDiskCache
+        _NAM = QNetworkAccessManager()
+        cache = QNetworkDiskCache(_NAM)
+        cache.setCacheDirectory(QStandardPaths.writableLocation(QStandardPaths.CacheLocation))
+        _NAM.setCache(cache)
+    return _NAM
+
+
+def network_request(url):
+    from PyQt5.QtNetwork import QNetworkRequest
+    # feeds and images all come from the same host, let Qt keep the connection around
+    request = QNetworkRequest(QUrl(url))
+    request.setAttribute(QNetworkRequest.Http2AllowedAttribute, True)
+    request.setAttribute(QNetworkRequest.FollowRedirectsAttribute, True)
+    request.setRawHeader(b'Connection', b'keep-alive')
+    return request
+
+
 class ESPWorker(QObject):
     error = pyqtSignal(Exception)
     waiting = pyqtSignal()
@@ -44,6 +113,8 @@ class ESPWorker(QObject):
         self._actions = actions
         self._params = params
         self._continue = False
+        self._mutex = QMutex()
+        self._cond = QWaitCondition()
 
     @pyqtSlot()
     def run(self):
@@ -72,24 +143,153 @@ class ESPWorker(QObject):
         self.done.emit()
 
     def wait_for_user(self):
+        self._mutex.lock()
         self._continue = False
         self.waiting.emit()
         while not self._continue:
-            sleep(.1)
+            self._cond.wait(self._mutex)
+        self._mutex.unlock()
 
     def continue_ok(self):
+        self._mutex.lock()
         self._continue = True
+        self._cond.wakeAll()
+        self._mutex.unlock()
 
     def abort(self):
         esptool.sw.setContinueFlag(False)
 
 
+class SerialReaderWorker(QObject):
+    responseMatched = pyqtSignal(object)
+    error = pyqtSignal(str)
+    done = pyqtSignal()
+
+    def __init__(self, port):
+        super().__init__()
+        self._port = port
+        self._outgoing = Queue()
+        self._running = True
+
+    @pyqtSlot()
+    def run(self):
+        port = QSerialPort(self._port)
+        port.setBaudRate(115200)
+        if not port.open(QIODevice.ReadWrite):
+            self.error.emit(port.errorString())
+            self.done.emit()
+            return
+
+        data = bytearray()
+        while self._running:
+            self.write_pending(port)
+            started = monotonic()
+            if port.waitForReadyRead(50):
+                # the device console wraps long lines, even inside JSON strings
+                data.extend(port.readAll().data().translate(None, b'\r\n'))
+                response = self.next_response(data)
+                while response is not None:
+                    self.responseMatched.emit(response)
+                    response = self.next_response(data)
+            elif port.error() == QSerialPort.ResourceError or monotonic() - started < 0.025:
+                # a plain timeout takes the whole 50 ms, failing sooner means the adapter went away
+                self.error.emit('Device disconnected')
+                port.close()
+                self.done.emit()
+                return
+
+        self.write_pending(port)
+        # waitForReadyRead() drains writes as well, only what is still queued needs flushing
+        while port.bytesToWrite():
+            if not port.waitForBytesWritten(500):
+                self.error.emit('Failed to send commands')
+                break
+        port.close()
+        self.done.emit()
+
+    def write_pending(self, port):
+        while not self._outgoing.empty():
+            port.write(self._outgoing.get_nowait())
+
+    @staticmethod
+    def next_response(data):
+        while True:
+            start = data.find(b'{')
+            if start < 0:
+                data.clear()
+                return None
+            del data[:start]
+
+            # surrogateescape keeps one character per invalid byte, so the decoded length maps back exactly
+            text = data.decode('utf-8', 'surrogateescape')
+            try:
+                response, end = _JSON_DECODER.raw_decode(text)
+            except json.JSONDecodeError as e:
+                if _JSON_TAIL.match(text, e.pos) or e.msg.startswith('Unterminated string'):
+                    # the rest of the response has not arrived yet
+                    return None
+                # not a JSON payload, skip this bracket
+                del data[:1]
+                continue
+
+            del data[:len(text[:end].encode('utf-8', 'surrogateescape'))]
+            return response
+
+    def write(self, cmd):
+        self._outgoing.put(cmd)
+
+    def stop(self):
+        self._running = False
+
+
+class SerialWriteWorker(QObject):
+    error = pyqtSignal(str)
+    done = pyqtSignal(int)
+
+    def __init__(self, port, data):
+        super().__init__()
+        self._port = port
+        self._data = data
+
+    @pyqtSlot()
+    def run(self):
+        port = QSerialPort(self._port)
+        port.setBaudRate(115200)
+        if not port.open(QIODevice.ReadWrite):
+            self.error.emit(port.errorString())
+            return
+
+        bytes_sent = port.write(self._data)
+        # waitForBytesWritten() returns after the first write, drain the whole payload before closing
+        while port.bytesToWrite():
+            if not port.waitForBytesWritten(5000):
+                self.error.emit(port.errorString())
+                port.close()
+                return
+        port.close()
+        self.done.emit(bytes_sent)
+
+
+class BannerSignals(QObject):
+    loaded = pyqtSignal(QImage)
+
+
+class BannerLoader(QRunnable):
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.signals = BannerSignals()
+
+    def run(self):
+        self.signals.loaded.emit(QImageReader(self.path).read())
+
+
 class SendConfigDialog(QDialog):
     def __init__(self):
         super().__init__()
         self.setMinimumWidth(640)
         self.setWindowTitle('Send configuration to device')
-        self.settings = QSettings('tasmotizer.cfg', QSettings.IniFormat)
+        self.settings = settings()
 
         self.commands = None
         self.module_mode = 0
@@ -172,8 +372,7 @@ class SendConfigDialog(QDialog):
         self.rbgModule.addButton(self.rbTemplate, 1)
 
         self.cbModule = QComboBox()
-        for mod_id, mod_name in MODULES.items():
-            self.cbModule.addItem(mod_name, mod_id)
+        self.cbModule.setModel(modules_model())
 
         self.leTemplate = QLineEdit()
         self.leTemplate.setPlaceholderText('Paste template string here')
@@ -197,28 +396,65 @@ class SendConfigDialog(QDialog):
         vl.addWidget(btns)
 
     def loadSettings(self):
-        self.gbWifi.setChecked(self.settings.value('gbWifi', False, bool))
-        self.leAP.setText(self.settings.value('AP'))
+        # read the config once, widgets are populated from the in-memory copy;
+        # every key lives in the top-level group, so there is no subtree to walk
+        self._cfg = {key: self.settings.value(key) for key in self.settings.childKeys()}
+
+        self.gbWifi.setChecked(self.cachedValue('gbWifi', False, bool))
+        self.leAP.setText(self.cachedValue('AP'))
 
-        self.gbRecWifi.setChecked(self.settings.value('gbRecWifi', False, bool))
+        self.gbRecWifi.setChecked(self.cachedValue('gbRecWifi', False, bool))
 
-        self.gbMQTT.setChecked(self.settings.value('gbMQTT', False, bool))
-        self.leBroker.setText(self.settings.value('Broker'))
-        self.sbPort.setValue(self.settings.value('Port', 1883, int))
-        self.leTopic.setText(self.settings.value('Topic', 'tasmota'))
-        self.leFullTopic.setText(self.settings.value('FullTopic', '%prefix%/%topic%/'))
-        self.leFriendlyName.setText(self.settings.value('FriendlyName'))
-        self.leMQTTUser.setText(self.settings.value('MQTTUser'))
+        self.gbMQTT.setChecked(self.cachedValue('gbMQTT', False, bool))
+        self.leBroker.setText(self.cachedValue('Broker'))
+        self.sbPort.setValue(self.cachedValue('Port', 1883, int))
+        self.leTopic.setText(self.cachedValue('Topic', 'tasmota'))
+        self.leFullTopic.setText(self.cachedValue('FullTopic', '%prefix%/%topic%/'))
+        self.leFriendlyName.setText(self.cachedValue('FriendlyName'))
+        self.leMQTTUser.setText(self.cachedValue('MQTTUser'))
 
-        self.gbModule.setChecked(self.settings.value('gbModule', False, bool))
+        self.gbModule.setChecked(self.cachedValue('gbModule', False, bool))
 
-        module_mode = self.settings.value('ModuleMode', 0, int)
+        module_mode = self.cachedValue('ModuleMode', 0, int)
         for b in self.rbgModule.buttons():
             if self.rbgModule.id(b) == module_mode:
                 b.setChecked(True)
                 self.setModuleMode(module_mode)
-        self.cbModule.setCurrentText(self.settings.value('Module', 'Generic'))
-        self.leTemplate.setText(self.settings.value('Template'))
+        self.cbModule.setCurrentText(self.cachedValue('Module', 'Generic'))
+        self.leTemplate.setText(self.cachedValue('Template'))
+
+    def cachedValue(self, key, default=None, type=None):
+        value = self._cfg.get(key)
+        if value is None:
+            return default
+        if type is bool:
+            # values read back from the INI file are strings
+            return value if isinstance(value, bool) else str(value).lower() == 'true'
+        return type(value) if type else value
+
+    def saveSettings(self):
+        values = {
+            'gbWifi': self.gbWifi.isChecked(),
+            'AP': self.leAP.text(),
+            'gbRecWifi': self.gbRecWifi.isChecked(),
+            'gbMQTT': self.gbMQTT.isChecked(),
+            'Broker': self.leBroker.text(),
+            'Port': self.sbPort.value(),
+            'Topic': self.leTopic.text(),
+            'FullTopic': self.leFullTopic.text(),
+            'FriendlyName': self.leFriendlyName.text(),
+            'MQTTUser': self.leMQTTUser.text(),
+            'gbModule': self.gbModule.isChecked(),
+            'ModuleMode': self.rbgModule.checkedId(),
+            'Module': self.cbModule.currentText(),
+            'Template': self.leTemplate.text(),
+        }
+
+        for key, value in values.items():
+            if self.cachedValue(key, type=type(value)) != value:
+                self.settings.setValue(key, value)
+                self._cfg[key] = value
+        self.settings.sync()
 
     def setModuleMode(self, radio):
         self.module_mode = radio
@@ -244,49 +480,48 @@ class SendConfigDialog(QDialog):
             backlog = []
 
             if self.gbWifi.isChecked():
-                backlog.extend(['ssid1 {}'.format(self.leAP.text()), 'password1 {}'.format(self.leAPPwd.text())])
+                backlog.extend([f'ssid1 {self.leAP.text()}', f'password1 {self.leAPPwd.text()}'])
 
             if self.gbRecWifi.isChecked():
                 backlog.extend(['ssid2 Recovery', 'password2 a1b2c3d4'])
 
             if self.gbMQTT.isChecked():
-                backlog.extend(['mqtthost {}'.format(self.leBroker.text()), 'mqttport {}'.format(self.sbPort.value())])
+                backlog.extend([f'mqtthost {self.leBroker.text()}', f'mqttport {self.sbPort.value()}'])
 
                 topic = self.leTopic.text()
                 if topic and topic != 'tasmota':
-                    backlog.append('topic {}'.format(topic))
+                    backlog.append(f'topic {topic}')
 
                 fulltopic = self.leFullTopic.text()
                 if fulltopic and fulltopic != '%prefix%/%topic%/':
-                    backlog.append('fulltopic {}'.format(fulltopic))
+                    backlog.append(f'fulltopic {fulltopic}')
 
                 fname = self.leFriendlyName.text()
                 if fname:
-                    backlog.append('friendlyname {}'.format(fname))
+                    backlog.append(f'friendlyname {fname}')
 
                 mqttuser = self.leMQTTUser.text()
                 if mqttuser:
-                    backlog.append('mqttuser {}'.format(mqttuser))
+                    backlog.append(f'mqttuser {mqttuser}')
 
                     mqttpassword = self.leMQTTPass.text()
                     if mqttpassword:
-                        backlog.append('mqttpassword {}'.format(mqttpassword))
+                        backlog.append(f'mqttpassword {mqttpassword}')
 
             if self.gbModule.isChecked():
                 if self.module_mode == 0:
-                    backlog.append('module {}'.format(self.cbModule.currentData()))
+                    backlog.append(f'module {self.cbModule.currentData()}')
 
                 elif self.module_mode == 1:
-                    backlog.extend(['template {}'.format(self.leTemplate.text()), 'module 0'])
+                    backlog.extend([f'template {self.leTemplate.text()}', 'module 0'])
 
-            self.commands = 'backlog {}\n'.format(';'.join(backlog))
+            self.commands = 'backlog ' + ';'.join(backlog) + '\n'
 
             self.done(QDialog.Accepted)
 
 
 class PinConfigDialog(QDialog):
 
-    responseMatched = pyqtSignal(str)
     readingDone     = pyqtSignal()
 
     def __init__(self, port):
@@ -298,80 +533,60 @@ class PinConfigDialog(QDialog):
         self.modules = None
         self.pins = None
 
-        self.port = QSerialPort(port)
-        self.uart_init()
+        self.uart_init(port)
         self.readingDone.connect(self.readingDoneCallback)
+        # whichever way the dialog is closed, the reader thread must not outlive it
+        self.finished.connect(self.stop_serial)
         
         self.createUI()
 
-    def uart_init(self):
+    def uart_init(self, port):
         # self.parseModules expects 2 responses for command, so used 2 times
         self.cmdsToSend = [b'GPIO\n', b'GPIOs\n']
         self.responseToSave = [self.parsePins, self.parseModules, self.parseModules]
 
-        self.uartReadData = ''
+        self.serial_thread = QThread()
+        self.serial = SerialReaderWorker(port)
+        self.serial.responseMatched.connect(self.parse_respone)
+        self.serial.error.connect(self.serial_error)
+        self.serial.done.connect(self.serial_thread.quit)
+        self.serial.moveToThread(self.serial_thread)
+        self.serial_thread.started.connect(self.serial.run)
 
-        self.port.setBaudRate(115200)
-        try:
-            self.port.open(QIODevice.ReadWrite)
-            cmd = self.cmdsToSend.pop(0)
-            self.port.write(cmd)
-        except Exception as e:
-            QMessageBox.critical(self, 'Error', f'Port access error:\n{e}')
-        self.port.readyRead.connect(self.uart_response_reader)
-        self.responseMatched.connect(self.parse_respone)
+        self.serial.write(self.cmdsToSend.pop(0))
+        self.serial_thread.start()
+
+    def serial_error(self, e):
+        QMessageBox.critical(self, 'Error', f'Port access error:\n{e}')
 
-    def parseModules(self, response:str):
+    def stop_serial(self):
+        if self.serial_thread.isRunning():
+            self.serial.stop()
+            self.serial_thread.quit()
+            self.serial_thread.wait(2000)
+
+    def parseModules(self, response:dict):
         if self.modules is None:
             self.modules = {}
-        rsp_d = json.loads(response)
-        self.modules = {**(self.modules), **(rsp_d)}
+        self.modules = {**(self.modules), **(response)}
 
-    def parsePins(self, response:str):
-        self.pins = json.loads(response)
+    def parsePins(self, response:dict):
+        self.pins = response
 
-    def parse_respone(self, response:str):
+    def parse_respone(self, response:dict):
         # Pass response to next function
-        response = response.replace('\n', '').replace('\r', '')
         if len(self.responseToSave) > 0:
             func = self.responseToSave.pop(0)
             func(response)
             
         # Send next command from list
         if len(self.cmdsToSend) > 0:
-            cmd = self.cmdsToSend.pop(0)
-            try:
-                self.port.write(cmd)
-            except Exception as e:
-                QMessageBox.critical(self, 'Error', f'Port access error:\n{e}')
+            self.serial.write(self.cmdsToSend.pop(0))
 
         if len(self.responseToSave) == 0 and len(self.cmdsToSend) == 0:
-            self.port.readyRead.disconnect(self.uart_response_reader)
+            self.serial.responseMatched.disconnect(self.parse_respone)
             self.readingDone.emit()
 
-
-    def uart_response_reader(self):
-        bracketRegex = re.compile(r"{|}")
-        self.uartReadData += str(self.port.readAll(), 'utf-8')
-
-        brakets = 0
-        brackets_opened = None
-        brackets_closed = None
-        for braket in bracketRegex.finditer(self.uartReadData):
-            if self.uartReadData[braket.start()] == '{':
-                if brackets_opened is None:
-                    brackets_opened = braket.start()
-                brakets += 1
-            elif brackets_opened is not None and self.uartReadData[braket.start()] == '}':
-                brakets -= 1
-                if brackets_opened is not None and brakets == 0:
-                    brackets_closed = braket.end()
-                    break
-
-        if brackets_opened is not None and brackets_closed is not None:
-            self.responseMatched.emit(self.uartReadData[brackets_opened:brackets_closed])
-            self.uartReadData = self.uartReadData[brackets_closed+1:]
-
     def createUI(self):
         self.vl = VLayout()
         self.setLayout(self.vl)
@@ -382,8 +597,6 @@ class PinConfigDialog(QDialog):
 
         self.vl.addWidget(self.loadingTextBox)
 
-        self.pinBtnGroup = QButtonGroup()
-
         self.btns = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Close)
         self.btns.rejected.connect(self.reject)
         self.btns.accepted.connect(self.reject)
@@ -416,24 +629,20 @@ class PinConfigDialog(QDialog):
         self.resize(400,500)
 
     def accept(self):
-        self.done(QDialog.Accepted)
+        backlog = []
         for pin, option in self.comboBoxesForGPIOS.items():
             prev = int(list(self.pins[pin].keys())[0].strip())
             curr = int(option.currentData())
             if prev == curr:
                 continue
-            cmd = f"{pin.replace(' ', '')} {option.currentData()}\n"
-            try:
-                self.port.write(bytes(cmd, 'utf-8'))
-                if not self.port.waitForBytesWritten(5000):
-                    raise(f"Failed to send command: {cmd}")
-            except Exception as e:
-                QMessageBox.critical(self, 'Error', f'Port access error:\n{e}')
-        self.port.close()
+            backlog.append(f"{pin.replace(' ', '')} {option.currentData()}")
+
+        if backlog:
+            # a single backlog is applied by the device in one go, instead of one round trip per pin
+            self.serial.write(bytes('backlog ' + ';'.join(backlog) + '\n', 'utf-8'))
+        self.done(QDialog.Accepted)
 
     def reject(self):
-        if self.port.isOpen():
-            self.port.close()
         self.done(QDialog.Accepted)
 
         
@@ -443,30 +652,27 @@ class CommandDialog(QWidget):
         self.setMinimumWidth(640)
         self.setWindowTitle('Serial Terminal')
 
-        self.commands = None
-        self.module_mode = 0
-
         self.createUI()
 
-        self.port = QSerialPort(port)
+        self.port = QSerialPort()
+        self.port.readyRead.connect(self.readFromPort)
+        self.setPort(port)
+
+    def setPort(self, port):
+        if self.port.isOpen():
+            self.port.close()
+        self.port.setPortName(port)
         self.port.setBaudRate(115200)
         self.port.open(QIODevice.OpenModeFlag.ReadWrite)
-        self.port.readyRead.connect(self.readFromPort)
 
     def sendCommand(self):
         if self.commandLine.toPlainText():
             try:
                 formatedTxt = self.commandLine.toPlainText().split()
                 formatedTxt = " ".join(formatedTxt) + "\n"
-                bytes_sent = self.port.write(bytes(formatedTxt, 'utf-8'))
+                self.port.write(bytes(formatedTxt, 'utf-8'))
             except Exception as e:
                 QMessageBox.critical(self, 'Error', f'Port access error:\n{e}')
-            # else:
-                # QMessageBox.information(self, 'Done', 'Command sent ({} bytes).'.format(bytes_sent))
-            # finally:
-                # if self.port.isOpen():
-                    # ret = str(self.port.readAll(), 'utf-8')
-                    # self.cmdDlg.consoleResponseField.setText(ret)
         else:
             QMessageBox.information(self, 'Done', 'Nothing to send')
 
@@ -492,7 +698,7 @@ class CommandDialog(QWidget):
         commandLineLayout.addWidget(self.commandLine)
         
         self.pbSendCommand = QPushButton("Send Command")
-        self.pbSendCommand.setStyleSheet('background-color: #aaaa00;')
+        self.pbSendCommand.setObjectName('sendcmd')
         self.pbSendCommand.setFixedSize(QSize(200,50))
         sendCommnadButtonLayout = HLayout()
         sendCommnadButtonLayout.addWidget(self.pbSendCommand)
@@ -504,21 +710,6 @@ class CommandDialog(QWidget):
 
         # Bind buttons
         self.pbSendCommand.clicked.connect(self.sendCommand)
-    
-    def setModuleMode(self, radio):
-        self.module_mode = radio
-        self.cbModule.setVisible(not radio)
-        self.leTemplate.setVisible(radio)
-
-    def accept(self):
-        backlog = []
-
-        cmd = self.commandLine.toPlainText()
-        if cmd:
-             backlog.extend(['cmd', cmd])
-
-        self.commands = 'backlog {}\n'.format(';'.join(backlog))
-        self.done(QDialog.Accepted)
 
     def closeEvent(self, a0: QCloseEvent) -> None:
         self.port.close()
@@ -534,11 +725,15 @@ class ProcessDialog(QDialog):
 
         self.exception = None
 
+        # progress arrives for every flash block, repaint at most once per frame
+        self._pending_progress = {}
+        self._progress_timer = QTimer(self)
+        self._progress_timer.setSingleShot(True)
+        self._progress_timer.timeout.connect(self.flush_progress)
+
         esptool.sw.progress.connect(self.update_progress)
 
-        self.nam = QNetworkAccessManager()
-        self.nrBinFile = QNetworkRequest()
-        self.bin_data = b''
+        self.bin_file = None
 
         self.setLayout(VLayout(5, 5))
         self.actions_layout = QFormLayout()
@@ -587,23 +782,31 @@ class ProcessDialog(QDialog):
         self.layout().addWidget(self.sb)
 
     def appendBinFile(self):
-        self.bin_data += self.bin_reply.readAll()
+        self.bin_file.write(self.bin_reply.readAll().data())
 
     def saveBinFile(self):
-        if self.bin_reply.error() == QNetworkReply.NoError:
+        self.appendBinFile()
+        self.bin_file.close()
+        if self.bin_reply.error() == self.bin_reply.NoError:
             self.file_path = self.file_path.split('/')[-1]
-            with open(self.file_path, 'wb') as f:
-                f.write(self.bin_data)
+            os.replace(self.bin_file.name, self.file_path)
             self.run_esp()
         else:
+            os.remove(self.bin_file.name)
             raise NetworkError
 
     def updateBinProgress(self, recv, total):
-        self._action_widgets['download'].setValue(recv//total*100)
+        value = recv * 100 // total if total > 0 else 0
+        pb = self._action_widgets['download']
+        if pb.value() != value:
+            pb.setValue(value)
 
     def download_bin(self):
-        self.nrBinFile.setUrl(QUrl(self.file_path))
-        self.bin_reply = self.nam.get(self.nrBinFile)
+        self.bin_file = open('{}.part'.format(self.file_path.split('/')[-1]), 'wb')
+        request = network_request(self.file_path)
+        # the image is written to disk by appendBinFile already
+        request.setAttribute(request.CacheSaveControlAttribute, False)
+        self.bin_reply = network_manager().get(request)
         self.bin_reply.readyRead.connect(self.appendBinFile)
         self.bin_reply.downloadProgress.connect(self.updateBinProgress)
         self.bin_reply.finished.connect(self.saveBinFile)
@@ -644,7 +847,16 @@ class ProcessDialog(QDialog):
             self.run_esp()
 
     def update_progress(self, action, value):
-        self._action_widgets[action].setValue(value)
+        self._pending_progress[action] = value
+        if not self._progress_timer.isActive():
+            self._progress_timer.start(16)
+
+    def flush_progress(self):
+        for action, value in self._pending_progress.items():
+            pb = self._action_widgets[action]
+            if pb.value() != value:
+                pb.setValue(value)
+        self._pending_progress.clear()
 
     @pyqtSlot()
     def wait_for_user(self):
@@ -660,8 +872,9 @@ class ProcessDialog(QDialog):
             self.abort()
 
     def stop_thread(self):
+        # quit first, waiting on a thread whose event loop still runs always burns the full timeout
+        self.esp_thread.quit()
         self.esp_thread.wait(2000)
-        self.esp_thread.exit()
 
     def accept(self):
         self.stop_thread()
@@ -683,7 +896,7 @@ class ProcessDialog(QDialog):
 
 
 class DeviceIP(QDialog):
-    def __init__(self, port: QSerialPort):
+    def __init__(self, port: str):
         super(DeviceIP, self).__init__()
 
         self.setWindowTitle('Device IP address')
@@ -702,9 +915,10 @@ class DeviceIP(QDialog):
 
         self.layout().addWidgets([self.ip, btn])
 
-        self.data = b''
+        self.data = bytearray()
 
-        self.port = port
+        self.port = QSerialPort(port)
+        self.port.setBaudRate(115200)
 
         self.re_ip = re.compile(r'(?:\()((?:[0-9]{1,3}\.){3}[0-9]{1,3})(?:\))')
 
@@ -717,25 +931,30 @@ class DeviceIP(QDialog):
 
     def read(self):
         try:
-            self.data += self.port.readAll()
-            match = self.re_ip.search(bytes(self.data).decode('utf8'))
+            self.data.extend(self.port.readAll().data())
+            match = self.re_ip.search(self.data.decode('utf8'))
             if match:
                 self.ip.setText(match[1])
         except:
             pass
 
+    def done(self, r):
+        if self.port.isOpen():
+            self.port.close()
+        super().done(r)
+
 
 class Tasmotizer(QDialog):
 
     def __init__(self):
         super().__init__()
-        self.settings = QSettings('tasmotizer.cfg', QSettings.IniFormat)
+        self.settings = settings()
 
-        self.port = ''
+        self.cmdDlg = None
+        self.pinDlg = None
 
-        self.nam = QNetworkAccessManager()
-        self.nrRelease = QNetworkRequest(QUrl(f'{BINS_URL}/tasmota/release/release.php'))
-        self.nrDevelopment = QNetworkRequest(QUrl(f'{BINS_URL}/tasmota/development.php'))
+        self.urlRelease = f'{BINS_URL}/tasmota/release/release.php'
+        self.urlDevelopment = f'{BINS_URL}/tasmota/development.php'
 
         self.esp_thread = None
 
@@ -745,22 +964,25 @@ class Tasmotizer(QDialog):
         self.mode = 0  # BIN file
         self.file_path = ''
 
-        self.release_data = b''
-        self.development_data = b''
+        self.feed_replies = {}
+        self.shown_feed = (None, None)
 
         self.create_ui()
 
         self.refreshPorts()
-        self.getFeeds()
 
     def create_ui(self):
         vl = VLayout(5)
         self.setLayout(vl)
 
-        # Banner
-        banner = QLabel()
-        banner.setPixmap(QPixmap(':/banner.png'))
-        vl.addWidget(banner)
+        # Banner, decoded off the GUI thread; the header read only reserves its space
+        self.banner = QLabel()
+        self.banner.setMinimumSize(QImageReader(':/banner.png').size())
+        vl.addWidget(self.banner)
+
+        self.banner_loader = BannerLoader(':/banner.png')
+        self.banner_loader.signals.loaded.connect(self.setBanner)
+        QThreadPool.globalInstance().start(self.banner_loader)
 
         # Port groupbox
         gbPort = GroupBoxH('Select port', 3)
@@ -777,9 +999,7 @@ class Tasmotizer(QDialog):
         hl_rb = HLayout(0)
         rbFile = QRadioButton('BIN file')
         self.rbRelease = QRadioButton('Release')
-        self.rbRelease.setEnabled(False)
         self.rbDev = QRadioButton('Development')
-        self.rbDev.setEnabled(False)
 
         self.rbgFW = QButtonGroup(gbFW)
         self.rbgFW.addButton(rbFile, 0)
@@ -787,6 +1007,7 @@ class Tasmotizer(QDialog):
         self.rbgFW.addButton(self.rbDev, 2)
 
         hl_rb.addWidgets([rbFile, self.rbRelease, self.rbDev])
+        self.feeds = {1: (self.urlRelease, self.rbRelease), 2: (self.urlDevelopment, self.rbDev)}
         gbFW.addLayout(hl_rb)
 
         self.wFile = QWidget()
@@ -810,7 +1031,7 @@ class Tasmotizer(QDialog):
         self.cbBackup.setToolTip('Firmware backup is ESPECIALLY recommended when you flash a Sonoff, Tuya, Shelly etc. for the first time.\nWithout a backup you will not be able to restore the original functionality.')
 
         self.cbxBackupSize = QComboBox()
-        self.cbxBackupSize.addItems([f'{2 ** s}MB' for s in range(5)])
+        self.cbxBackupSize.addItems(_BACKUP_SIZES)
         self.cbxBackupSize.setEnabled(False)
 
         hl_backup_size = HLayout(0)
@@ -830,18 +1051,18 @@ class Tasmotizer(QDialog):
         # Buttons
         self.pbTasmotize = QPushButton('Tasmotize!')
         self.pbTasmotize.setFixedHeight(50)
-        self.pbTasmotize.setStyleSheet('background-color: #223579;')
+        self.pbTasmotize.setObjectName('tasmotize')
 
         self.pbConfig = QPushButton('Send config')
-        self.pbConfig.setStyleSheet('background-color: #571054;')
+        self.pbConfig.setObjectName('config')
         self.pbConfig.setFixedHeight(50)
 
         self.pbGetIP = QPushButton('Get IP')
         self.pbGetIP.setFixedSize(QSize(75, 50))
-        self.pbGetIP.setStyleSheet('background-color: #2a8a26;')
+        self.pbGetIP.setObjectName('getip')
 
         self.pbQuit = QPushButton('Quit')
-        self.pbQuit.setStyleSheet('background-color: #c91017;')
+        self.pbQuit.setObjectName('quit')
         self.pbQuit.setFixedSize(QSize(200, 50))
 
 
@@ -852,11 +1073,11 @@ class Tasmotizer(QDialog):
         vl.addLayout(hl_btns)
         
         self.pbSendCommand = QPushButton("Serial terminal")
-        self.pbSendCommand.setStyleSheet('background-color: #aaaa00;')
+        self.pbSendCommand.setObjectName('sendcmd')
         self.pbSendCommand.setFixedSize(QSize(200,50))
 
         self.pbPinConfig = QPushButton("Pin config")
-        self.pbPinConfig.setStyleSheet('background-color: #2a8a26;')
+        self.pbPinConfig.setObjectName('pincfg')
         self.pbPinConfig.setFixedSize(QSize(200,50))
 
         sendCommnadButtonLayout = HLayout([50, 3, 50, 3])
@@ -868,84 +1089,119 @@ class Tasmotizer(QDialog):
         quitLayout.addWidgets([self.pbQuit])
         vl.addLayout(quitLayout)
 
-        self.pbSendCommand.clicked.connect(self.sendCommandDialog)
-        self.pbPinConfig.clicked.connect(self.openPinConfig)
+        self.pbSendCommand.clicked.connect(self.sendCommandDialog, Qt.DirectConnection)
+        self.pbPinConfig.clicked.connect(self.openPinConfig, Qt.DirectConnection)
 
-        pbRefreshPorts.clicked.connect(self.refreshPorts)
-        self.rbgFW.buttonClicked[int].connect(self.setBinMode)
+        pbRefreshPorts.clicked.connect(self.refreshPorts, Qt.DirectConnection)
+        self.rbgFW.buttonClicked[int].connect(self.setBinMode, Qt.DirectConnection)
         rbFile.setChecked(True)
-        pbFile.clicked.connect(self.openBinFile)
+        pbFile.clicked.connect(self.openBinFile, Qt.DirectConnection)
 
-        self.cbBackup.toggled.connect(self.cbxBackupSize.setEnabled)
+        self.cbBackup.toggled.connect(self.cbxBackupSize.setEnabled, Qt.DirectConnection)
 
-        self.pbTasmotize.clicked.connect(self.start_process)
-        self.pbConfig.clicked.connect(self.send_config)
-        self.pbGetIP.clicked.connect(self.get_ip)
-        self.pbQuit.clicked.connect(self.reject)
+        self.pbTasmotize.clicked.connect(self.start_process, Qt.DirectConnection)
+        self.pbConfig.clicked.connect(self.send_config, Qt.DirectConnection)
+        self.pbGetIP.clicked.connect(self.get_ip, Qt.DirectConnection)
+        self.pbQuit.clicked.connect(self.reject, Qt.DirectConnection)
     
+    def setBanner(self, image):
+        self.banner.setPixmap(QPixmap.fromImage(image))
+
     def sendCommandDialog(self):
-        self.cmdDlg = CommandDialog(port=self.cbxPort.currentData())
+        # the terminal is kept around and only reattached to the selected port
+        if self.cmdDlg is None:
+            self.cmdDlg = CommandDialog(port=self.cbxPort.currentData())
+        else:
+            self.cmdDlg.setPort(self.cbxPort.currentData())
         self.cmdDlg.show()
+        self.cmdDlg.raise_()
         # if self.cmdDlg.exec_() == QDialog.Accepted:
             # self.sendCommand()
 
     def openPinConfig(self):
-        self.cmdDlg = PinConfigDialog(port=self.cbxPort.currentData())
-        self.cmdDlg.show()
-        # if self.cmdDlg.exec_() == QDialog.Accepted:
+        # a dialog that is still open is still talking to the device, bring it up instead of dropping it
+        if self.pinDlg is not None and self.pinDlg.isVisible():
+            self.pinDlg.raise_()
+            self.pinDlg.activateWindow()
+            return
+
+        # built from what the device reports, so there is nothing to reuse between openings
+        self.pinDlg = PinConfigDialog(port=self.cbxPort.currentData())
+        self.pinDlg.show()
+        # if self.pinDlg.exec_() == QDialog.Accepted:
             # self.sendCommand()
 
     def refreshPorts(self):
+        ports = sorted(QSerialPortInfo.availablePorts(), key=QSerialPortInfo.portName, reverse=True)
+        self.cbxPort.blockSignals(True)
         self.cbxPort.clear()
-        ports = reversed(sorted(port.portName() for port in QSerialPortInfo.availablePorts()))
-        for p in ports:
-            port = QSerialPortInfo(p)
-            self.cbxPort.addItem(port.portName(), port.systemLocation())
+        self.cbxPort.addItems([port.portName() for port in ports])
+        for idx, port in enumerate(ports):
+            self.cbxPort.setItemData(idx, port.systemLocation())
+        self.cbxPort.blockSignals(False)
 
     def setBinMode(self, radio):
         self.mode = radio
         self.wFile.setVisible(self.mode == 0)
         self.cbHackboxBin.setVisible(self.mode > 0)
 
-        if self.mode == 1:
-            self.processReleaseInfo()
-        elif self.mode == 2:
-            self.processDevelopmentInfo()
-
-    def getFeeds(self):
-        self.release_reply = self.nam.get(self.nrRelease)
-        self.release_reply.readyRead.connect(self.appendReleaseInfo)
-        self.release_reply.finished.connect(lambda: self.rbRelease.setEnabled(True))
-
-        self.development_reply = self.nam.get(self.nrDevelopment)
-        self.development_reply.readyRead.connect(self.appendDevelopmentInfo)
-        self.development_reply.finished.connect(lambda: self.rbDev.setEnabled(True))
-
-    def appendReleaseInfo(self):
-        self.release_data += self.release_reply.readAll()
+        if self.mode in self.feeds:
+            self.getFeed(self.mode)
 
-    def appendDevelopmentInfo(self):
-        self.development_data += self.development_reply.readAll()
+    def getFeed(self, mode):
+        url, rb = self.feeds[mode]
+        if url in _FEEDS:
+            self.fill_bin_combo(_FEEDS[url], rb)
 
-    def processReleaseInfo(self):
-        self.fill_bin_combo(self.release_data, self.rbRelease)
-
-    def processDevelopmentInfo(self):
-        self.fill_bin_combo(self.development_data, self.rbDev)
+        else:
+            # don't leave the other feed's images selectable while this one downloads
+            self.cbHackboxBin.clear()
+            self.cbHackboxBin.setEnabled(False)
+            self.shown_feed = (None, None)
+
+            if url not in self.feed_replies:
+                request = network_request(url)
+                request.setAttribute(request.CacheLoadControlAttribute, request.PreferCache)
+                reply = network_manager().get(request)
+                reply.finished.connect(lambda: self.feedFetched(mode, reply))
+                self.feed_replies[url] = reply
+
+    def feedFetched(self, mode, reply):
+        url, rb = self.feeds[mode]
+        del self.feed_replies[url]
+        reply.deleteLater()
+
+        data = reply.readAll()
+        if reply.error() == reply.NoError:
+            _FEEDS[url] = data
+        if self.mode == mode:
+            self.fill_bin_combo(data, rb)
 
     def fill_bin_combo(self, data, rb):
+        # the combo still lists this exact feed, switching radios back doesn't need a re-parse
+        shown_rb, shown_data = self.shown_feed
+        if shown_rb is rb and shown_data is data:
+            return
+
         try:
-            reply = json.loads(str(data, 'utf8'))
-            version, bins = list(reply.items())[0]
+            # orjson reads the QByteArray buffer in place, json needs a bytes copy
+            reply = orjson.loads(memoryview(data)) if orjson else json.loads(data.data())
+            version, bins = next(iter(reply.items()))
             version = version.replace('-', ' ').title()
 
             rb.setText(version)
             if len(bins) > 0:
+                fields = [_BIN_FIELDS(img) for img in bins]
+                labels = [f'{binary} [{filesize // 1024}kB]' for binary, filesize, _ in fields]
+
+                self.cbHackboxBin.blockSignals(True)
                 self.cbHackboxBin.clear()
-                for img in bins:
-                    img['filesize'] //= 1024
-                    self.cbHackboxBin.addItem('{binary} [{filesize}kB]'.format(**img), '{otaurl}'.format(**img))
+                self.cbHackboxBin.addItems(labels)
+                for idx, (_, _, otaurl) in enumerate(fields):
+                    self.cbHackboxBin.setItemData(idx, otaurl)
+                self.cbHackboxBin.blockSignals(False)
                 self.cbHackboxBin.setEnabled(True)
+                self.shown_feed = (rb, data)
         except json.JSONDecodeError as e:
             self.setBinMode(0)
             self.rbgFW.button(0).setChecked(True)
@@ -958,52 +1214,36 @@ class Tasmotizer(QDialog):
             self.file.setText(file)
 
     def get_ip(self):
-        self.port = QSerialPort(self.cbxPort.currentData())
-        self.port.setBaudRate(115200)
-
-        DeviceIP(self.port).exec_()
-
-        if self.port.isOpen():
-            self.port.close()
+        DeviceIP(self.cbxPort.currentData()).exec_()
 
     def send_config(self):
         dlg = SendConfigDialog()
         if dlg.exec_() == QDialog.Accepted:
             if dlg.commands:
-                try:
-                    self.port = QSerialPort(self.cbxPort.currentData())
-                    self.port.setBaudRate(115200)
-                    self.port.open(QIODevice.ReadWrite)
-                    bytes_sent = self.port.write(bytes(dlg.commands, 'utf8'))
-                except Exception as e:
-                    QMessageBox.critical(self, 'Error', f'Port access error:\n{e}')
-                else:
-                    self.settings.setValue('gbWifi', dlg.gbWifi.isChecked())
-                    self.settings.setValue('AP', dlg.leAP.text())
-
-                    self.settings.setValue('gbRecWifi', dlg.gbRecWifi.isChecked())
-
-                    self.settings.setValue('gbMQTT', dlg.gbMQTT.isChecked())
-                    self.settings.setValue('Broker', dlg.leBroker.text())
-                    self.settings.setValue('Port', dlg.sbPort.value())
-                    self.settings.setValue('Topic', dlg.leTopic.text())
-                    self.settings.setValue('FullTopic', dlg.leFullTopic.text())
-                    self.settings.setValue('FriendlyName', dlg.leFriendlyName.text())
-                    self.settings.setValue('MQTTUser', dlg.leMQTTUser.text())
-
-                    self.settings.setValue('gbModule', dlg.gbModule.isChecked())
-                    self.settings.setValue('ModuleMode', dlg.rbgModule.checkedId())
-                    self.settings.setValue('Module', dlg.cbModule.currentText())
-                    self.settings.setValue('Template', dlg.leTemplate.text())
-                    self.settings.sync()
-
-                    QMessageBox.information(self, 'Done', 'Configuration sent ({} bytes)\nDevice will restart.'.format(bytes_sent))
-                finally:
-                    if self.port.isOpen():
-                        self.port.close()
+                self.pbConfig.setEnabled(False)
+                self.config_dlg = dlg
+
+                self.config_thread = QThread()
+                self.config_writer = SerialWriteWorker(self.cbxPort.currentData(), dlg.commands.encode('utf-8'))
+                self.config_writer.done.connect(self.configSent)
+                self.config_writer.error.connect(self.configError)
+                self.config_writer.done.connect(self.config_thread.quit)
+                self.config_writer.error.connect(self.config_thread.quit)
+                self.config_writer.moveToThread(self.config_thread)
+                self.config_thread.started.connect(self.config_writer.run)
+                self.config_thread.start()
             else:
                 QMessageBox.information(self, 'Done', 'Nothing to send')
 
+    def configSent(self, bytes_sent):
+        self.pbConfig.setEnabled(True)
+        self.config_dlg.saveSettings()
+        QMessageBox.information(self, 'Done', 'Configuration sent ({} bytes)\nDevice will restart.'.format(bytes_sent))
+
+    def configError(self, e):
+        self.pbConfig.setEnabled(True)
+        QMessageBox.critical(self, 'Error', f'Port access error:\n{e}')
+
     def start_process(self):
         try:
             if self.mode == 0:
@@ -1015,6 +1255,9 @@ class Tasmotizer(QDialog):
 
             elif self.mode in (1, 2):
                 self.file_path = self.cbHackboxBin.currentData()
+                if self.file_path is None:
+                    # the feed is still downloading, failed or has no images
+                    raise NoBinFile
 
             process_dlg = ProcessDialog(
                 self.cbxPort.currentData(),
@@ -1048,10 +1291,8 @@ def main():
     app.setAttribute(Qt.AA_DisableWindowContextHelpButton)
     app.setQuitOnLastWindowClosed(True)
     app.setStyle('Fusion')
-
     app.setPalette(dark_palette)
-    app.setStyleSheet('QToolTip { color: #ffffff; background-color: #2a82da; border: 1px solid white; }')
-    app.setStyle('Fusion')
+    app.setStyleSheet('QToolTip { color: #ffffff; background-color: #2a82da; border: 1px solid white; } ' + _BUTTONS_QSS)
 
     mw = Tasmotizer()
     mw.show()